@@ -7,28 +7,371 @@ Analyzes C++ source files and extracts information for test generation
 import os
 import re
 import json
+import mmap
+import bisect
+import shutil
 import subprocess
 from pathlib import Path
-from typing import Dict, List, Tuple
+from contextlib import contextmanager
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# Each script runs standalone, so this import block (and write_json_file, where
+# present) is duplicated in analyze_cpp_project.py, build_and_test.py and
+# github_analyzer.py; keep the copies byte-identical
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to the standard library
+    orjson = None
+
+# Regex patterns used by the extractors, compiled once at import time.
+# They are bytes patterns so they can scan the mmap'd file without decoding it.
+# Includes are found with plain find() calls instead, see extract_includes().
+_CLASS_RE = re.compile(
+    rb'class\s+(\w+)(?:\s*:\s*(?:public|private|protected)\s+\w+)?\s*\{',
+    re.MULTILINE
+)
+# The qualifiers before a method (any mix of whitespace and keywords) are
+# matched one token at a time; nesting \s* inside a repeated group backtracks
+# exponentially on long runs of whitespace
+_METHOD_RE = re.compile(
+    rb'(?:public|private|protected):\s*\n(?:\s|virtual|static|inline)*(\w+(?:\s*<[^>]*>)?)\s+(\w+)\s*$$[^)]*$$(?:\s*const)?(?:\s*override)?(?:\s*=\s*0)?;',
+    re.MULTILINE
+)
+_FUNC_RE = re.compile(
+    rb'^(?:(?:inline|static|extern)\s+)*(\w+(?:\s*<[^>]*>)?)\s+(\w+)\s*$$[^)]*$$\s*\{',
+    re.MULTILINE
+)
+
+SOURCE_EXTENSIONS = {'.cpp', '.cc', '.cxx', '.c++'}
+HEADER_EXTENSIONS = {'.h', '.hpp', '.hxx', '.h++'}
+
+# Below this many files the process pool startup costs more than it saves.
+# Duplicated in analyze_cpp_project.py and github_analyzer.py; keep in sync
+PARALLEL_MIN_FILES = 32
+
+# Larger files are almost always generated or vendored code and are skipped;
+# so are files with a NUL byte near the start, which are not C++ source
+MAX_FILE_SIZE = 2_000_000
+BINARY_SNIFF_BYTES = 512
+
+# How many files ahead of the one being parsed to ask the kernel to read in
+PREFETCH_DEPTH = 8
+
+# Files per rg invocation, to stay well under the OS argument length limit
+RG_BATCH_SIZE = 1000
+
+# Per-file results are cached between runs, keyed by mtime and size.
+# Bump CACHE_VERSION whenever the extractors change what they return.
+CACHE_FILE = ".cpp_analysis_cache.json"
+CACHE_VERSION = 3
+
+@contextmanager
+def mapped_file(file_path: Path) -> Iterator[bytes]:
+    """Map a file read-only into memory; empty files yield b'' (mmap rejects them)"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+def _decode(raw: bytes) -> str:
+    return raw.decode('utf-8', 'replace')
+
+def newline_offsets(content: bytes) -> List[int]:
+    """Return the sorted offsets of every newline in content"""
+    offsets = []
+    pos = content.find(b'\n')
+    while pos != -1:
+        offsets.append(pos)
+        pos = content.find(b'\n', pos + 1)
+    return offsets
+
+def line_number_at(offsets: List[int], pos: int) -> int:
+    """Map a byte offset to a 1-based line number using newline_offsets()"""
+    return bisect.bisect_left(offsets, pos) + 1
+
+def extract_classes(content: bytes, file_path: Path, offsets: List[int]) -> List[Dict]:
+    """Extract class definitions from the contents of a C++ file"""
+    classes = []
+    
+    # The pattern needs the literals 'class' and '{'; find() runs at memchr
+    # speed and rules out whole files without stepping the regex engine
+    # through them. (find() rather than 'in', which only tests single bytes
+    # on an mmap.)
+    if content.find(b'class') == -1 or content.find(b'{') == -1:
+        return classes
+        
+    # Simple regex to find class definitions
+    for match in _CLASS_RE.finditer(content):
+        class_name = _decode(match.group(1))
+        
+        # Extract methods from the class
+        methods = extract_methods_from_class(content, match.start())
+        
+        classes.append({
+            'name': class_name,
+            'file': str(file_path),
+            'methods': methods,
+            'line_number': line_number_at(offsets, match.start())
+        })
+        
+    return classes
+
+def extract_methods_from_class(content: bytes, class_start: int) -> List[Dict]:
+    """Extract method signatures from a class"""
+    methods = []
+    
+    # Find the class body
+    class_body_start = content.find(b'{', class_start)
+    if class_body_start == -1:
+        return methods
+        
+    # Jump between braces with find() instead of walking every character
+    depth = 1
+    next_open = content.find(b'{', class_body_start + 1)
+    next_close = content.find(b'}', class_body_start + 1)
+    while True:
+        if next_close == -1:
+            return methods
+        if next_open != -1 and next_open < next_close:
+            depth += 1
+            next_open = content.find(b'{', next_open + 1)
+        else:
+            depth -= 1
+            if depth == 0:
+                class_body_end = next_close
+                break
+            next_close = content.find(b'}', next_close + 1)
+        
+    class_body = content[class_body_start:class_body_end]
+    
+    # Simple method extraction (this could be more sophisticated)
+    for match in _METHOD_RE.finditer(class_body):
+        return_type = _decode(match.group(1).strip())
+        method_name = _decode(match.group(2).strip())
+        
+        methods.append({
+            'name': method_name,
+            'return_type': return_type,
+            'signature': _decode(match.group(0).strip())
+        })
+        
+    return methods
+
+def extract_functions(content: bytes, file_path: Path, offsets: List[int]) -> List[Dict]:
+    """Extract standalone function definitions from the contents of a C++ file"""
+    functions = []
+    
+    # A definition needs a literal '{', see extract_classes()
+    if content.find(b'{') == -1:
+        return functions
+        
+    # Pattern for standalone functions
+    for match in _FUNC_RE.finditer(content):
+        return_type = _decode(match.group(1).strip())
+        func_name = _decode(match.group(2).strip())
+        
+        # Skip main function and common keywords
+        if func_name in ['main', 'if', 'for', 'while', 'switch']:
+            continue
+            
+        functions.append({
+            'name': func_name,
+            'return_type': return_type,
+            'file': str(file_path),
+            'line_number': line_number_at(offsets, match.start())
+        })
+        
+    return functions
+
+def extract_includes(content: bytes) -> List[str]:
+    """Extract include directives by jumping between '#include' occurrences.
+
+    Directives make up a tiny fraction of a file, so letting find() skip
+    straight to them is much cheaper than running a regex over every byte.
+    """
+    includes = []
+    
+    pos = content.find(b'#include')
+    while pos != -1:
+        line_end = content.find(b'\n', pos)
+        if line_end == -1:
+            line_end = len(content)
+            
+        rest = content[pos + len(b'#include'):line_end].lstrip()
+        opener = rest[:1]
+        if opener in (b'<', b'"'):
+            close = rest.find(b'>' if opener == b'<' else b'"', 1)
+            if close > 1:
+                includes.append(_decode(rest[1:close]))
+                
+        pos = content.find(b'#include', line_end)
+        
+    return includes
+
+def find_class_candidates(files: List[Path]) -> Optional[Set[str]]:
+    """Return the files that may declare a class, as reported by ripgrep.
+
+    ripgrep's automaton is far faster than a Python regex at ruling out files
+    with no class at all. It matches line by line while _CLASS_RE can span a
+    newline, so only the fixed string 'class' is searched for, which gives a
+    superset of the real matches. Returns None when rg is unavailable or
+    fails, in which case every file has to be scanned.
+    """
+    if not files or shutil.which('rg') is None:
+        return None
+        
+    candidates = set()
+    for i in range(0, len(files), RG_BATCH_SIZE):
+        batch = [str(file_path) for file_path in files[i:i + RG_BATCH_SIZE]]
+        try:
+            result = subprocess.run(
+                # --no-config so a user's RIPGREP_CONFIG_PATH (--max-filesize,
+                # --type, ...) can't drop candidates
+                ['rg', '--no-config', '--files-with-matches', '--null', '--no-messages',
+                 '-F', '-e', 'class', '--'] + batch,
+                capture_output=True,
+                timeout=120
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+            
+        # rg exits with 1 when nothing matched and 2 on errors
+        if result.returncode not in (0, 1):
+            return None
+        candidates.update(os.fsdecode(path) for path in result.stdout.split(b'\0') if path)
+        
+    return candidates
+
+def analyze_file(file_path: Path, may_have_classes: bool = True,
+                 max_file_size: Optional[int] = MAX_FILE_SIZE) -> Optional[Tuple[List[Dict], List[Dict], List[str]]]:
+    """Extract classes, functions and includes from one file.
+
+    The file is mapped once and shared by all extractors; only the captured
+    names are decoded. When may_have_classes is False the class scan is
+    skipped. Files over max_file_size bytes (None for no limit) and binary
+    files are skipped. Returns None if the file could not be processed, so
+    callers can tell a failure from a file with nothing in it. Kept at module
+    level so it can be shipped to worker processes.
+    """
+    try:
+        with mapped_file(file_path) as content:
+            if max_file_size and len(content) > max_file_size:
+                print(f"Skipping {file_path}: larger than {max_file_size} bytes")
+                return [], [], []
+            if b'\0' in content[:BINARY_SNIFF_BYTES]:
+                print(f"Skipping {file_path}: looks like a binary file")
+                return [], [], []
+                
+            offsets = newline_offsets(content)
+            return (
+                extract_classes(content, file_path, offsets) if may_have_classes else [],
+                extract_functions(content, file_path, offsets),
+                extract_includes(content)
+            )
+    except Exception as e:
+        print(f"Error processing {file_path}: {e}")
+        return None
+
+def prefetch_file(file_path: Path, max_file_size: Optional[int] = MAX_FILE_SIZE):
+    """Ask the kernel to start reading a file in the background.
+
+    A no-op where posix_fadvise is unavailable and for files that
+    analyze_file() would skip for their size anyway.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+        
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            size = os.fstat(fd).st_size
+            if size and not (max_file_size and size > max_file_size):
+                os.posix_fadvise(fd, 0, size, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+def analyze_batch(files: List[Path], may_have_classes: List[bool],
+                  max_file_size: Optional[int] = MAX_FILE_SIZE) -> List[Optional[Tuple[List[Dict], List[Dict], List[str]]]]:
+    """Run analyze_file over a batch of files, overlapping disk reads with parsing.
+
+    The next PREFETCH_DEPTH files are kept in flight with the kernel's
+    readahead, so their data is usually cached by the time they are parsed.
+    """
+    for file_path in files[:PREFETCH_DEPTH]:
+        prefetch_file(file_path, max_file_size)
+        
+    results = []
+    for index, (file_path, has_classes) in enumerate(zip(files, may_have_classes)):
+        if index + PREFETCH_DEPTH < len(files):
+            prefetch_file(files[index + PREFETCH_DEPTH], max_file_size)
+        results.append(analyze_file(file_path, has_classes, max_file_size))
+        
+    return results
 
 class CppProjectAnalyzer:
-    def __init__(self, project_path: str):
+    def __init__(self, project_path: str, max_workers: Optional[int] = None,
+                 cache_file: Optional[str] = CACHE_FILE,
+                 max_file_size: Optional[int] = MAX_FILE_SIZE):
         self.project_path = Path(project_path)
+        self.max_workers = max_workers
+        self.max_file_size = max_file_size
+        self.cache_file = Path(cache_file) if cache_file else None
         self.source_files = []
         self.header_files = []
         self.classes = {}
         self.functions = {}
+        self._cache = self.load_cache()
+        
+    def load_cache(self) -> Dict:
+        """Load per-file results from a previous run, if any"""
+        if not self.cache_file or not self.cache_file.exists():
+            return {}
+            
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable analysis cache {self.cache_file}: {e}")
+            return {}
+            
+        # Results depend on the size limit, so a different limit invalidates them
+        if cache.get('version') != CACHE_VERSION or cache.get('max_file_size') != self.max_file_size:
+            return {}
+        return cache.get('files', {})
+        
+    def save_cache(self):
+        """Persist per-file results for the next run"""
+        if not self.cache_file:
+            return
+            
+        try:
+            with open(self.cache_file, 'w') as f:
+                json.dump({
+                    'version': CACHE_VERSION,
+                    'max_file_size': self.max_file_size,
+                    'files': self._cache
+                }, f)
+        except OSError as e:
+            print(f"Could not write analysis cache {self.cache_file}: {e}")
         
     def scan_project(self) -> Dict:
         """Scan the project directory for C++ files"""
         print(f"Scanning project: {self.project_path}")
         
-        # Find all C++ source and header files
-        for ext in ['*.cpp', '*.cc', '*.cxx', '*.c++']:
-            self.source_files.extend(self.project_path.rglob(ext))
-            
-        for ext in ['*.h', '*.hpp', '*.hxx', '*.h++']:
-            self.header_files.extend(self.project_path.rglob(ext))
+        # Find all C++ source and header files in a single walk of the tree
+        for root, _, files in os.walk(self.project_path):
+            for name in files:
+                ext = os.path.splitext(name)[1]
+                if ext in SOURCE_EXTENSIONS:
+                    self.source_files.append(Path(root) / name)
+                elif ext in HEADER_EXTENSIONS:
+                    self.header_files.append(Path(root) / name)
             
         print(f"Found {len(self.source_files)} source files")
         print(f"Found {len(self.header_files)} header files")
@@ -41,121 +384,94 @@ class CppProjectAnalyzer:
     
     def extract_classes(self, file_path: Path) -> List[Dict]:
         """Extract class definitions from a C++ file"""
-        classes = []
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            # Simple regex to find class definitions
-            class_pattern = r'class\s+(\w+)(?:\s*:\s*(?:public|private|protected)\s+\w+)?\s*\{'
-            matches = re.finditer(class_pattern, content, re.MULTILINE)
-            
-            for match in matches:
-                class_name = match.group(1)
-                
-                # Extract methods from the class
-                methods = self.extract_methods_from_class(content, match.start())
-                
-                classes.append({
-                    'name': class_name,
-                    'file': str(file_path),
-                    'methods': methods,
-                    'line_number': content[:match.start()].count('\n') + 1
-                })
-                
-        except Exception as e:
-            print(f"Error processing {file_path}: {e}")
-            
-        return classes
+        result = analyze_file(file_path, max_file_size=self.max_file_size)
+        return result[0] if result else []
     
-    def extract_methods_from_class(self, content: str, class_start: int) -> List[Dict]:
+    def extract_methods_from_class(self, content: bytes, class_start: int) -> List[Dict]:
         """Extract method signatures from a class"""
-        methods = []
-        
-        # Find the class body
-        brace_count = 0
-        class_body_start = content.find('{', class_start)
-        if class_body_start == -1:
-            return methods
-            
-        i = class_body_start
-        while i < len(content):
-            if content[i] == '{':
-                brace_count += 1
-            elif content[i] == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    class_body_end = i
-                    break
-            i += 1
-        else:
-            return methods
-            
-        class_body = content[class_body_start:class_body_end]
-        
-        # Simple method extraction (this could be more sophisticated)
-        method_pattern = r'(?:public|private|protected):\s*\n(?:\s*(?:virtual|static|inline)?\s*)*(\w+(?:\s*<[^>]*>)?)\s+(\w+)\s*$$[^)]*$$(?:\s*const)?(?:\s*override)?(?:\s*=\s*0)?;'
-        
-        for match in re.finditer(method_pattern, class_body, re.MULTILINE):
-            return_type = match.group(1).strip()
-            method_name = match.group(2).strip()
-            
-            methods.append({
-                'name': method_name,
-                'return_type': return_type,
-                'signature': match.group(0).strip()
-            })
-            
-        return methods
+        return extract_methods_from_class(content, class_start)
     
     def extract_functions(self, file_path: Path) -> List[Dict]:
         """Extract standalone function definitions"""
-        functions = []
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            # Pattern for standalone functions
-            func_pattern = r'^(?:(?:inline|static|extern)\s+)*(\w+(?:\s*<[^>]*>)?)\s+(\w+)\s*$$[^)]*$$\s*\{'
-            
-            for match in re.finditer(func_pattern, content, re.MULTILINE):
-                return_type = match.group(1).strip()
-                func_name = match.group(2).strip()
-                
-                # Skip main function and common keywords
-                if func_name in ['main', 'if', 'for', 'while', 'switch']:
-                    continue
-                    
-                functions.append({
-                    'name': func_name,
-                    'return_type': return_type,
-                    'file': str(file_path),
-                    'line_number': content[:match.start()].count('\n') + 1
-                })
-                
-        except Exception as e:
-            print(f"Error processing {file_path}: {e}")
-            
-        return functions
+        result = analyze_file(file_path, max_file_size=self.max_file_size)
+        return result[1] if result else []
     
     def analyze_dependencies(self) -> Dict:
         """Analyze include dependencies"""
         dependencies = {}
         
         for file_path in self.source_files + self.header_files:
+            result = analyze_file(file_path, max_file_size=self.max_file_size)
+            dependencies[str(file_path)] = result[2] if result else []
+            
+        return dependencies
+    
+    def analyze_files(self, files: List[Path]) -> List[Tuple[List[Dict], List[Dict], List[str]]]:
+        """Run analyze_file over all files, reusing cached results for unchanged ones"""
+        results = [None] * len(files)
+        stale = []
+        cache = {}
+        
+        for index, file_path in enumerate(files):
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    
-                includes = re.findall(r'#include\s*[<"]([^>"]+)[>"]', content)
-                dependencies[str(file_path)] = includes
+                st = os.stat(file_path)
+            except OSError:
+                stale.append((index, None))
+                continue
                 
-            except Exception as e:
-                print(f"Error analyzing dependencies in {file_path}: {e}")
+            key = [st.st_mtime_ns, st.st_size]
+            entry = self._cache.get(str(file_path))
+            if entry and entry['key'] == key:
+                results[index] = (entry['classes'], entry['functions'], entry['includes'])
+                cache[str(file_path)] = entry
+            else:
+                stale.append((index, key))
                 
-        return dependencies
+        fresh = self._run_analysis([files[index] for index, _ in stale])
+        for (index, key), result in zip(stale, fresh):
+            if result is None:
+                # A failure may be transient, so it is not cached; the file
+                # is analyzed again on the next run
+                results[index] = ([], [], [])
+                continue
+                
+            results[index] = result
+            if key is not None:
+                classes, functions, includes = result
+                cache[str(files[index])] = {
+                    'key': key,
+                    'classes': classes,
+                    'functions': functions,
+                    'includes': includes
+                }
+                
+        # Dropping entries for files that disappeared keeps the cache from growing forever
+        self._cache = cache
+        return results
+    
+    def _run_analysis(self, files: List[Path]) -> List[Optional[Tuple[List[Dict], List[Dict], List[str]]]]:
+        """Run analyze_file over files, in worker processes for larger batches"""
+        candidates = find_class_candidates(files)
+        if candidates is None:
+            may_have_classes = [True] * len(files)
+        else:
+            may_have_classes = [str(file_path) in candidates for file_path in files]
+            
+        workers = self.max_workers or os.cpu_count() or 1
+        if workers == 1 or len(files) < PARALLEL_MIN_FILES:
+            return analyze_batch(files, may_have_classes, self.max_file_size)
+            
+        # Large batches keep the per-task IPC overhead small relative to the regex work
+        batch_size = max(1, len(files) // (workers * 4))
+        starts = range(0, len(files), batch_size)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            batches = executor.map(
+                analyze_batch,
+                [files[i:i + batch_size] for i in starts],
+                [may_have_classes[i:i + batch_size] for i in starts],
+                repeat(self.max_file_size, len(starts))
+            )
+            return [result for batch in batches for result in batch]
     
     def generate_analysis_report(self) -> Dict:
         """Generate comprehensive analysis report"""
@@ -164,19 +480,18 @@ class CppProjectAnalyzer:
         # Scan project structure
         project_info = self.scan_project()
         
-        # Extract classes and functions
+        # Extract classes, functions and includes from every file
+        all_files = self.source_files + self.header_files
         all_classes = []
         all_functions = []
+        dependencies = {}
         
-        for file_path in self.source_files + self.header_files:
-            classes = self.extract_classes(file_path)
-            functions = self.extract_functions(file_path)
-            
+        for file_path, (classes, functions, includes) in zip(all_files, self.analyze_files(all_files)):
             all_classes.extend(classes)
             all_functions.extend(functions)
+            dependencies[str(file_path)] = includes
             
-        # Analyze dependencies
-        dependencies = self.analyze_dependencies()
+        self.save_cache()
         
         report = {
             'project_info': project_info,
@@ -192,28 +507,51 @@ class CppProjectAnalyzer:
         
         return report
 
+def write_json_file(path: str, data: Dict):
+    """Write data as indented JSON, using orjson when it is installed.
+
+    orjson rejects some strings json accepts, such as the surrogate escapes
+    os functions use for file names that aren't valid UTF-8; those reports
+    fall back to json.dump.
+    """
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        except TypeError:  # orjson.JSONEncodeError is a TypeError
+            encoded = None
+        if encoded is not None:
+            Path(path).write_bytes(encoded)
+            return
+            
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
 def main():
     """Main function to run the analysis"""
     import sys
+    import argparse
     
-    if len(sys.argv) != 2:
-        print("Usage: python analyze_cpp_project.py <project_path>")
-        sys.exit(1)
-        
-    project_path = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Analyze a C++ project for test generation")
+    parser.add_argument("project_path", help="root directory of the C++ project")
+    parser.add_argument(
+        "--max-file-size", type=int, default=MAX_FILE_SIZE,
+        help=f"skip files larger than this many bytes, 0 for no limit (default: {MAX_FILE_SIZE})"
+    )
+    args = parser.parse_args()
+    
+    project_path = args.project_path
     
     if not os.path.exists(project_path):
         print(f"Error: Project path '{project_path}' does not exist")
         sys.exit(1)
         
-    analyzer = CppProjectAnalyzer(project_path)
+    analyzer = CppProjectAnalyzer(project_path, max_file_size=args.max_file_size or None)
     report = analyzer.generate_analysis_report()
     
     # Save report to JSON file
     output_file = "cpp_analysis_report.json"
-    with open(output_file, 'w') as f:
-        json.dump(report, f, indent=2)
-        
+    write_json_file(output_file, report)
+    
     print(f"\nAnalysis complete! Report saved to {output_file}")
     print(f"Found {report['statistics']['total_classes']} classes")
     print(f"Found {report['statistics']['total_functions']} functions")
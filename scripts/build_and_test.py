@@ -8,8 +8,44 @@ import os
 import subprocess
 import json
 import re
+import shutil
+import threading
+from collections import deque
 from pathlib import Path
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Each script runs standalone, so this import block (and write_json_file, where
+# present) is duplicated in analyze_cpp_project.py, build_and_test.py and
+# github_analyzer.py; keep the copies byte-identical
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to the standard library
+    orjson = None
+
+# Only the last lines of build output are kept; errors are almost always there
+MAX_BUILD_OUTPUT_LINES = 2000
+
+# Patterns for categorizing compiler/linker errors, compiled once at import time
+_BUILD_ERROR_PATTERNS = [
+    (re.compile(r"error: '([^']+)' was not declared"), "undeclared_identifier"),
+    (re.compile(r"fatal error: ([^:]+): No such file"), "missing_include"),
+    (re.compile(r"error: no matching function for call to '([^']+)'"), "function_signature"),
+    (re.compile(r"error: '([^']+)' does not name a type"), "unknown_type"),
+    (re.compile(r"undefined reference to `([^']+)'"), "undefined_reference")
+]
+_GCOV_FILE_RE = re.compile(r"File '([^']+)'")
+_GCOV_LINES_RE = re.compile(r"Lines executed:(\d+\.\d+)% of (\d+)")
+
+def iter_lines(text: str) -> Iterator[str]:
+    """Yield the lines of text one at a time without building a list of them"""
+    start = 0
+    end = text.find('\n')
+    while end != -1:
+        yield text[start:end]
+        start = end + 1
+        end = text.find('\n', start)
+    yield text[start:]
 
 class CppBuildManager:
     def __init__(self, project_path: str, test_path: str = "tests"):
@@ -18,6 +54,11 @@ class CppBuildManager:
         self.build_path = Path("build")
         self.coverage_path = Path("coverage")
         
+        # Look up the optional coverage tools once instead of probing per run
+        self.lcov = shutil.which("lcov")
+        self.genhtml = shutil.which("genhtml")
+        self.ninja = shutil.which("ninja")
+        
     def setup_build_environment(self):
         """Setup build directories and environment"""
         print("Setting up build environment...")
@@ -38,12 +79,19 @@ class CppBuildManager:
 cmake_minimum_required(VERSION 3.10)
 project(CppUnitTestProject)
 
+# Use ccache when available so unchanged files aren't recompiled every cycle
+find_program(CCACHE_PROGRAM ccache)
+if(CCACHE_PROGRAM)
+    set(CMAKE_CXX_COMPILER_LAUNCHER ${CCACHE_PROGRAM})
+    set(CMAKE_C_COMPILER_LAUNCHER ${CCACHE_PROGRAM})
+endif()
+
 # Set C++ standard
 set(CMAKE_CXX_STANDARD 17)
 set(CMAKE_CXX_STANDARD_REQUIRED ON)
 
 # Add compiler flags for coverage
-set(CMAKE_CXX_FLAGS "${CMAKE_CXX_FLAGS} -Wall -Wextra -g -O0 --coverage")
+set(CMAKE_CXX_FLAGS "${CMAKE_CXX_FLAGS} -Wall -Wextra -g -Og --coverage")
 set(CMAKE_EXE_LINKER_FLAGS "${CMAKE_EXE_LINKER_FLAGS} --coverage")
 
 # Find required packages
@@ -95,42 +143,110 @@ endif()
         """Compile the project with tests"""
         print("Compiling project...")
         
+        env = self.build_environment()
+        use_ninja = self.use_ninja()
+        
         try:
-            # Change to build directory
-            os.chdir(self.build_path)
-            
-            # Run cmake
+            # Run cmake in the build directory without changing our own cwd
+            cmake_command = ["cmake", str(self.project_path.resolve())]
+            if use_ninja:
+                cmake_command[1:1] = ["-G", "Ninja"]
             cmake_result = subprocess.run(
-                ["cmake", ".."],
+                cmake_command,
                 capture_output=True,
                 text=True,
-                timeout=60
+                timeout=60,
+                cwd=self.build_path,
+                env=env
             )
             
             if cmake_result.returncode != 0:
                 return False, f"CMake failed:\n{cmake_result.stderr}"
                 
-            # Run make
-            make_result = subprocess.run(
-                ["make", "-j4"],
-                capture_output=True,
-                text=True,
-                timeout=300
+            # Run the build tool, one job per core
+            build_tool = "ninja" if use_ninja else "make"
+            build_returncode, build_output = self._run_streaming(
+                [self.ninja if use_ninja else "make", f"-j{os.cpu_count() or 1}"],
+                timeout=300,
+                env=env
             )
             
-            if make_result.returncode != 0:
-                return False, f"Make failed:\n{make_result.stderr}"
+            if build_returncode != 0:
+                return False, f"{build_tool.capitalize()} failed:\n{build_output}"
                 
-            return True, f"Build successful:\n{make_result.stdout}"
+            return True, f"Build successful:\n{build_output}"
             
         except subprocess.TimeoutExpired:
             return False, "Build timed out"
         except Exception as e:
             return False, f"Build error: {str(e)}"
+            
+    def use_ninja(self) -> bool:
+        """Whether to generate Ninja files rather than Makefiles.
+
+        Ninja is used when installed, unless the build directory was already
+        configured for Make (CMake refuses to switch generators in place).
+        """
+        if not self.ninja:
+            return False
+        configured = (self.build_path / "CMakeCache.txt").exists()
+        return not configured or (self.build_path / "build.ninja").exists()
+        
+    def build_environment(self) -> Dict[str, str]:
+        """Environment for cmake/make, pointing ccache at a persistent cache.
+
+        Values already set in the caller's environment take precedence.
+        """
+        env = dict(os.environ)
+        env.setdefault("CCACHE_DIR", str(Path.home() / ".ccache-utg"))
+        env.setdefault("CCACHE_COMPRESS", "1")
+        return env
+        
+    def _run_streaming(self, command: List[str], timeout: int,
+                       env: Optional[Dict[str, str]] = None) -> Tuple[int, str]:
+        """Run a command in the build directory, keeping only the tail of its output.
+
+        stderr is merged into stdout and read line by line, so memory stays
+        bounded by MAX_BUILD_OUTPUT_LINES however much the build prints.
+        Compilers echo source lines, so undecodable bytes are replaced rather
+        than raised on.
+        """
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            encoding='utf-8',
+            errors='replace',
+            cwd=self.build_path,
+            env=env
+        )
+        
+        timed_out = threading.Event()
+        
+        def kill():
+            timed_out.set()
+            process.kill()
+            
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        tail = deque(maxlen=MAX_BUILD_OUTPUT_LINES)
+        try:
+            for line in process.stdout:
+                tail.append(line)
+            returncode = process.wait()
         finally:
-            # Return to original directory
-            os.chdir("..")
+            timer.cancel()
+            process.stdout.close()
+            # Don't leave the build running if reading its output failed
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(command, timeout)
             
+        return returncode, ''.join(tail)
+        
     def run_tests(self) -> Tuple[bool, str]:
         """Run the compiled tests"""
         print("Running tests...")
@@ -163,21 +279,24 @@ endif()
             # Run gcov on all source files
             coverage_data = {}
             
-            # Find all .gcda files
-            gcda_files = list(self.build_path.rglob("*.gcda"))
+            # Find all .gcda files, in a stable order so merged results are too
+            gcda_files = sorted(self.build_path.rglob("*.gcda"))
             
             if not gcda_files:
                 return {"error": "No coverage data found"}
                 
-            for gcda_file in gcda_files:
-                # Run gcov
-                result = subprocess.run(
-                    ["gcov", str(gcda_file)],
-                    capture_output=True,
-                    text=True,
-                    cwd=self.build_path
-                )
+            # One gcov process per .gcda file, run in parallel. A single gcov
+            # call over several files merges the counts of headers they share,
+            # so batching would make the figures depend on how files were
+            # grouped, and with it on the core count
+            workers = min(os.cpu_count() or 1, len(gcda_files))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self._run_gcov, gcda_files))
                 
+            # map() keeps file order, so a header reported by several
+            # translation units ends up with the figures from the last .gcda
+            # file, as when gcov ran over them one at a time
+            for result in results:
                 if result.returncode == 0:
                     # Parse gcov output
                     coverage_info = self.parse_gcov_output(result.stdout)
@@ -191,16 +310,29 @@ endif()
         except Exception as e:
             return {"error": f"Coverage generation failed: {str(e)}"}
             
+    def _run_gcov(self, gcda_file: Path) -> subprocess.CompletedProcess:
+        """Run gcov on a single .gcda file.
+
+        Only the summary on stdout is used, so -n stops gcov from writing
+        .gcov files: concurrent runs would otherwise overwrite each other's
+        copies of shared headers in the build directory.
+        """
+        return subprocess.run(
+            ["gcov", "-n", str(gcda_file.resolve())],
+            capture_output=True,
+            text=True,
+            cwd=self.build_path
+        )
+        
     def parse_gcov_output(self, gcov_output: str) -> Dict:
         """Parse gcov output to extract coverage information"""
         coverage_info = {}
         
-        lines = gcov_output.split('\n')
         current_file = None
         
-        for line in lines:
+        for line in iter_lines(gcov_output):
             # Look for file information
-            file_match = re.search(r"File '([^']+)'", line)
+            file_match = _GCOV_FILE_RE.search(line)
             if file_match:
                 current_file = file_match.group(1)
                 coverage_info[current_file] = {
@@ -212,7 +344,7 @@ endif()
                 
             # Look for coverage statistics
             if current_file and "Lines executed:" in line:
-                match = re.search(r"Lines executed:(\d+\.\d+)% of (\d+)", line)
+                match = _GCOV_LINES_RE.search(line)
                 if match:
                     coverage_info[current_file]['coverage_percentage'] = float(match.group(1))
                     coverage_info[current_file]['total_lines'] = int(match.group(2))
@@ -224,44 +356,40 @@ endif()
         
     def generate_html_coverage_report(self):
         """Generate HTML coverage report using lcov"""
-        try:
-            # Check if lcov is available
-            subprocess.run(["lcov", "--version"], capture_output=True, check=True)
+        if not self.lcov or not self.genhtml:
+            print("lcov not available, skipping HTML report generation")
+            return
             
+        try:
             # Generate lcov info file
             subprocess.run([
-                "lcov", "--capture", "--directory", str(self.build_path),
+                self.lcov, "--capture", "--directory", str(self.build_path),
                 "--output-file", str(self.coverage_path / "coverage.info")
             ], check=True)
             
             # Generate HTML report
             subprocess.run([
-                "genhtml", str(self.coverage_path / "coverage.info"),
+                self.genhtml, str(self.coverage_path / "coverage.info"),
                 "--output-directory", str(self.coverage_path / "html")
             ], check=True)
             
             print(f"HTML coverage report generated in {self.coverage_path / 'html'}")
             
         except (subprocess.CalledProcessError, FileNotFoundError):
-            print("lcov not available, skipping HTML report generation")
+            print("lcov failed, skipping HTML report generation")
             
     def analyze_build_errors(self, build_output: str) -> List[Dict]:
         """Analyze build errors and categorize them"""
         errors = []
         
-        error_patterns = [
-            (r"error: '([^']+)' was not declared", "undeclared_identifier"),
-            (r"fatal error: ([^:]+): No such file", "missing_include"),
-            (r"error: no matching function for call to '([^']+)'", "function_signature"),
-            (r"error: '([^']+)' does not name a type", "unknown_type"),
-            (r"undefined reference to `([^']+)'", "undefined_reference")
-        ]
-        
-        lines = build_output.split('\n')
-        
-        for line in lines:
-            for pattern, error_type in error_patterns:
-                match = re.search(pattern, line)
+        for line in iter_lines(build_output):
+            # Every pattern needs one of these substrings; most build output
+            # lines are progress messages and are dropped here without a regex
+            if 'error' not in line and 'undefined reference' not in line:
+                continue
+                
+            for pattern, error_type in _BUILD_ERROR_PATTERNS:
+                match = pattern.search(line)
                 if match:
                     errors.append({
                         'type': error_type,
@@ -307,6 +435,25 @@ endif()
             
         return result
 
+def write_json_file(path: str, data: Dict):
+    """Write data as indented JSON, using orjson when it is installed.
+
+    orjson rejects some strings json accepts, such as the surrogate escapes
+    os functions use for file names that aren't valid UTF-8; those reports
+    fall back to json.dump.
+    """
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        except TypeError:  # orjson.JSONEncodeError is a TypeError
+            encoded = None
+        if encoded is not None:
+            Path(path).write_bytes(encoded)
+            return
+            
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
 def main():
     """Main function"""
     import sys
@@ -317,9 +464,8 @@ def main():
     result = build_manager.full_build_and_test_cycle()
     
     # Save results
-    with open("build_test_results.json", 'w') as f:
-        json.dump(result, f, indent=2)
-        
+    write_json_file("build_test_results.json", result)
+    
     print("\nBuild and test cycle complete!")
     print(f"Build success: {result['build_success']}")
     print(f"Test success: {result['test_success']}")
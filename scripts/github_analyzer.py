@@ -6,14 +6,223 @@ Clones repositories and analyzes C++ code to extract classes, methods, and depen
 
 import os
 import re
+import sys
 import json
+import hashlib
 import subprocess
 import tempfile
 import shutil
-from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+import stat
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse
 
+try:
+    # google-re2 matches in linear time, so pathological input can't make the
+    # extraction patterns backtrack; optional, the stdlib engine is the fallback
+    import re2 as _fast_re
+except ImportError:
+    _fast_re = re
+
+# Each script runs standalone, so this import block (and write_json_file, where
+# present) is duplicated in analyze_cpp_project.py, build_and_test.py and
+# github_analyzer.py; keep the copies byte-identical
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to the standard library
+    orjson = None
+
+# Regex patterns used by CppCodeAnalyzer, compiled once at import time.
+# The extraction patterns use only syntax that re and re2 share.
+# A directive is one line, so neither the gap nor the path may cross a
+# newline; otherwise an unterminated '#include "foo' would run on to the next
+# quote anywhere in the file
+_INCLUDE_RE = _fast_re.compile(r'#include[ \t]*[<"]([^>"\n]+)[>"]')
+# Namespaces, class headers and standalone functions, as one alternation so
+# the file is scanned once; the named group that matched says which it was.
+# Only the class header is matched, the body is delimited by _find_closing_brace.
+# Alternatives that open with an identifier are anchored with \b: a match can
+# never start inside a word where it failed at the word's start, and without
+# the anchor the engine retries them at every character of every identifier.
+_FUNC_PATTERN = r'\b(?:(?P<func_prefix>\w+)\s+)?(?P<func_first>\w+)\s+(?P<func_second>\w+)\s*\([^)]*\)\s*\{'
+_DECLARATION_RE = _fast_re.compile(
+    r'namespace\s+(?P<namespace>\w+)\s*\{'
+    r'|class\s+(?P<cls>\w+)(?:\s*:\s*(?:public|private|protected)\s+(?P<base>\w+))?\s*\{'
+    r'|' + _FUNC_PATTERN
+)
+# For files with neither 'class' nor 'namespace', where only functions can match
+_FUNC_RE = _fast_re.compile(_FUNC_PATTERN)
+# Everything _extract_class_members looks for in a class body, as one
+# alternation so the body is scanned once; the named group that matched
+# says what was found. Order matters: a method needs a return type, so it is
+# tried before the constructor alternative, which would otherwise claim it.
+# Identifier-led alternatives are anchored with \b as in _DECLARATION_RE.
+_CLASS_MEMBER_RE = _fast_re.compile(
+    r'(?P<access>public|private|protected):'
+    r'|~(?P<dtor>\w+)\s*\([^)]*\)\s*(?:\{|\s*;)'
+    r'|(?P<virtual>virtual\s+)?\b(?P<return_type>\w+(?:::\w+)?)\s+(?P<method>\w+)\s*\([^)]*\)'
+    r'\s*(?P<const>const)?\s*(?:override)?\s*(?:\{|\s*;)'
+    r'|\b(?:(?P<member_type>\w+(?:::\w+)?)\s+)?\w+\s+(?P<member>\w+)\s*;'
+    r'|\b(?P<ctor>\w+)\s*\([^)]*\)\s*(?::\s*[^)]*)?\s*(?:\{|\s*;)'
+)
+
+# Helpers for blanking literals and scanning braces stay on the stdlib engine
+_BRACE_RE = re.compile(r'[{}]')
+# Comments and string/character literals, blanked out before extraction.
+# Raw strings are matched whole, since their quotes and backslashes are not
+# escapes. Ordinary literals cannot span a line, so one stray quote can't pair
+# up with another far down the file. A number is matched so that a digit
+# separator ('1'000') isn't taken to open a character literal; it is kept.
+_COMMENT_STR_RE = re.compile(
+    r'//[^\n]*|/\*.*?\*/'
+    r'|\b(?:u8|[uUL])?R"(?P<delim>[^()\\\s"]{0,16})\(.*?\)(?P=delim)"'
+    r'|(?P<number>\b\d[\w.]*(?:\'[\w.]+)+)'
+    r'|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'',
+    re.DOTALL
+)
+_NON_NEWLINE_RE = re.compile(r'[^\n]')
+
+_CPP_EXTENSIONS = {'cpp', 'cc', 'cxx', 'hpp', 'h', 'hh', 'hxx'}
+_SKIP_DIRS = {'.git', 'node_modules', 'build', 'bin', 'obj', 'target'}
+
+# Larger files are almost always generated or amalgamated code
+MAX_FILE_SIZE = 4_000_000
+
+# Below this many files the process pool startup costs more than it saves.
+# Duplicated in analyze_cpp_project.py and github_analyzer.py; keep in sync
+PARALLEL_MIN_FILES = 32
+
+# Unlinking is bound by filesystem latency, not CPU, so use more threads than cores
+REMOVE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def _blank_comments_and_strings(content: str) -> str:
+    """Replace comments and string/character literals with spaces.
+
+    Newlines are kept, so offsets and line numbers in the result match content.
+    """
+    def blank(match):
+        text = match.group()
+        if match.group('number') is not None:
+            return text
+        return _NON_NEWLINE_RE.sub(' ', text) if '\n' in text else ' ' * len(text)
+
+    return _COMMENT_STR_RE.sub(blank, content)
+
+
+def _find_closing_brace(content: str, start: int) -> int:
+    """Return the index of the '}' closing a block whose body starts at start.
+
+    content must already have comments and literals blanked out.
+    Returns len(content) if the block is never closed.
+    """
+    depth = 1
+    for brace in _BRACE_RE.finditer(content, start):
+        if brace.group() == '{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return brace.start()
+    return len(content)
+
+
+def _strip_nested_blocks(body: str) -> str:
+    """Return a class body with the contents of its nested blocks removed.
+
+    Inline method bodies and nested types go, but their braces stay, so
+    'int f() { return x; }' becomes 'int f() {}' and still reads as a method.
+    body must already have comments and literals blanked out.
+    """
+    if '{' not in body:
+        return body
+
+    pieces = []
+    depth = 0
+    start = 0
+    for brace in _BRACE_RE.finditer(body):
+        if brace.group() == '{':
+            if depth == 0:
+                pieces.append(body[start:brace.end()])
+            depth += 1
+        elif depth > 0:
+            depth -= 1
+            if depth == 0:
+                start = brace.start()
+    if depth == 0:
+        pieces.append(body[start:])
+    return ''.join(pieces)
+
+
+# Parse records. A large repository yields millions of these, so they use
+# __slots__ instead of a per-instance dict, and stay objects until the report
+# is serialized (see _json_default). Declared by hand rather than with
+# dataclass(slots=True), which needs Python 3.10. They are frozen and hold
+# tuples, so the content cache can hand the same records to every caller.
+class _Record:
+    __slots__ = ()
+
+    def __reduce__(self):
+        # Pickling slots restores them with setattr, which frozen classes refuse
+        return type(self), tuple(getattr(self, field.name) for field in fields(self))
+
+
+@dataclass(frozen=True)
+class MethodInfo(_Record):
+    __slots__ = ('name', 'return_type', 'is_virtual', 'is_const')
+    name: str
+    return_type: str
+    is_virtual: bool
+    is_const: bool
+
+
+@dataclass(frozen=True)
+class MemberInfo(_Record):
+    """A data member, or a constructor/destructor with type set accordingly"""
+    __slots__ = ('name', 'type')
+    name: str
+    type: str
+
+
+@dataclass(frozen=True)
+class FunctionInfo(_Record):
+    __slots__ = ('name', 'return_type')
+    name: str
+    return_type: str
+
+
+@dataclass(frozen=True)
+class AccessSpecifiers(_Record):
+    __slots__ = ('specifiers',)
+    specifiers: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class ClassInfo(_Record):
+    __slots__ = ('name', 'base_class', 'methods', 'constructors', 'destructors',
+                 'members', 'access_specifiers')
+    name: str
+    base_class: Optional[str]
+    methods: Tuple[MethodInfo, ...]
+    constructors: Tuple[MemberInfo, ...]
+    destructors: Tuple[MemberInfo, ...]
+    members: Tuple[MemberInfo, ...]
+    access_specifiers: AccessSpecifiers
+
+
+def _function_from_match(match) -> FunctionInfo:
+    """Build a FunctionInfo from a _FUNC_PATTERN match"""
+    return_type = match.group('func_prefix') or 'void'
+    func_name = match.group('func_first') or match.group('func_second')
+    return FunctionInfo(func_name, return_type)
+
+
+def _json_default(obj: Any) -> Dict:
+    """json.dump hook turning parse records into dicts, one level at a time"""
+    return {field.name: getattr(obj, field.name) for field in fields(obj)}
+
 
 class CppCodeAnalyzer:
     """Analyzes C++ code to extract classes, methods, and dependencies"""
@@ -22,147 +231,200 @@ class CppCodeAnalyzer:
         self.classes = {}
         self.includes = set()
         self.namespaces = set()
+        # Parse results by content digest, so duplicated files (vendored or
+        # copied headers) are parsed once. Entries are only ever copied
+        # shallowly: their sequences are tuples of frozen records
+        self._file_cache: Dict[bytes, Dict] = {}
 
     def analyze_file(self, file_path: str) -> Dict:
-        """Analyze a single C++ file and extract class information"""
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+        """Analyze a single C++ file and extract class information.
 
-            return self._parse_cpp_content(content, file_path)
+        Files over MAX_FILE_SIZE bytes (amalgamations such as sqlite3.c,
+        generated tables) are skipped and yield an empty result.
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size > MAX_FILE_SIZE:
+                    return {}
+                data = f.read()
+
+            # Every declaration pattern needs a '{'; without one and without an
+            # #include there is nothing to extract, so skip hashing and decoding
+            if b'{' not in data and b'#include' not in data:
+                return self._parse_cpp_content('', file_path)
+
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            cached = self._file_cache.get(digest)
+            if cached is None:
+                cached = self._parse_cpp_content(
+                    data.decode('utf-8', errors='replace'),
+                    file_path,
+                    has_include=b'#include' in data,
+                    has_braces=b'{' in data,
+                    has_types=b'class' in data or b'namespace' in data
+                )
+                self._file_cache[digest] = cached
+
+            file_info = dict(cached)
+            file_info['file_path'] = file_path
+            return file_info
         except Exception as e:
-            import sys
             print(f"Error analyzing {file_path}: {e}", file=sys.stderr)
             return {}
 
-    def _parse_cpp_content(self, content: str, file_path: str) -> Dict:
-        """Parse C++ content and extract class definitions"""
+    def _parse_cpp_content(self, content: str, file_path: str, has_include: bool = True,
+                           has_braces: bool = True, has_types: bool = True) -> Dict:
+        """Parse C++ content and extract class definitions.
+
+        The has_* flags say whether content contains '#include', '{', and
+        'class' or 'namespace'; extractors that need an absent token are skipped.
+        """
         file_info = {
             'file_path': file_path,
-            'classes': [],
-            'includes': [],
-            'namespaces': [],
-            'functions': []
+            'classes': (),
+            'includes': (),
+            'namespaces': (),
+            'functions': ()
         }
 
-        # Extract includes
-        include_pattern = r'#include\s*[<"]([^>"]+)[>"]'
-        includes = re.findall(include_pattern, content)
-        file_info['includes'] = includes
-
-        # Extract namespaces
-        namespace_pattern = r'namespace\s+(\w+)\s*{'
-        namespaces = re.findall(namespace_pattern, content)
-        file_info['namespaces'] = namespaces
-
-        # Extract class definitions
-        class_pattern = r'class\s+(\w+)(?:\s*:\s*(?:public|private|protected)\s+(\w+))?\s*{([^}]+)}'
-        classes = re.findall(class_pattern, content, re.DOTALL)
-
-        for class_match in classes:
-            class_name = class_match[0]
-            base_class = class_match[1] if class_match[1] else None
-            class_body = class_match[2]
-
-            class_info = {
-                'name': class_name,
-                'base_class': base_class,
-                'methods': self._extract_methods(class_body),
-                'constructors': self._extract_constructors(class_body),
-                'destructors': self._extract_destructors(class_body),
-                'members': self._extract_members(class_body),
-                'access_specifiers': self._extract_access_specifiers(class_body)
-            }
-            file_info['classes'].append(class_info)
-
-        # Extract standalone functions
-        function_pattern = r'(?:(\w+)\s+)?(\w+)\s+(\w+)\s*\([^)]*\)\s*{'
-        functions = re.findall(function_pattern, content)
-        for func_match in functions:
-            return_type = func_match[0] if func_match[0] else 'void'
-            func_name = func_match[1] if func_match[1] else func_match[2]
-            file_info['functions'].append({
-                'name': func_name,
-                'return_type': return_type
-            })
-
+        # Extract includes (before blanking, since their paths are string literals).
+        # Includes and namespaces repeat across most files of a repository, so
+        # intern them to keep one copy of each and make set hashing cheap
+        if has_include:
+            includes = tuple(sys.intern(include) for include in _INCLUDE_RE.findall(content))
+            file_info['includes'] = includes
+
+        if not has_braces:
+            return file_info
+
+        # Everything else runs on a copy with comments and literals blanked out,
+        # so none of the extractors can match inside them
+        content = _blank_comments_and_strings(content)
+
+        if not has_types:
+            file_info['functions'] = tuple(_function_from_match(match) for match in _FUNC_RE.finditer(content))
+            return file_info
+
+        classes = []
+        namespaces = []
+        functions = []
+
+        # Extract namespaces, class definitions and standalone functions
+        for match in _DECLARATION_RE.finditer(content):
+            if match.group('namespace') is not None:
+                namespaces.append(sys.intern(match.group('namespace')))
+
+            elif match.group('cls') is not None:
+                body_start = match.end()
+                class_body = content[body_start:_find_closing_brace(content, body_start)]
+                # Only declarations at the class's own level are members;
+                # statements in inline method bodies are not
+                class_body = _strip_nested_blocks(class_body)
+
+                class_info = ClassInfo(
+                    match.group('cls'),
+                    match.group('base'),
+                    **self._extract_class_members(class_body)
+                )
+                classes.append(class_info)
+
+            else:
+                functions.append(_function_from_match(match))
+
+        file_info['classes'] = tuple(classes)
+        file_info['namespaces'] = tuple(namespaces)
+        file_info['functions'] = tuple(functions)
         return file_info
 
-    def _extract_methods(self, class_body: str) -> List[Dict]:
-        """Extract method definitions from class body"""
+    def _extract_class_members(self, class_body: str) -> Dict:
+        """Extract methods, constructors, destructors, members and access
+        specifiers from a class body in a single pass"""
         methods = []
+        constructors = []
+        destructors = []
+        members = []
+        specifiers = []
 
-        # Method pattern: return_type method_name(params) { or return_type method_name(params);
-        method_pattern = r'(?:virtual\s+)?(\w+(?:::\w+)?)\s+(\w+)\s*\([^)]*\)\s*(?:const)?\s*(?:override)?\s*(?:{|\s*;)'
-        method_matches = re.findall(method_pattern, class_body)
+        for match in _CLASS_MEMBER_RE.finditer(class_body):
+            if match.group('access') is not None:
+                specifiers.append(match.group('access'))
 
-        for match in method_matches:
-            return_type = match[0]
-            method_name = match[1]
+            elif match.group('dtor') is not None:
+                destructors.append(MemberInfo(f"~{match.group('dtor')}", 'destructor'))
 
-            # Skip constructors and destructors
-            if method_name in ['~', 'operator']:
-                continue
+            elif match.group('method') is not None:
+                method_name = match.group('method')
 
-            methods.append({
-                'name': method_name,
-                'return_type': return_type,
-                'is_virtual': 'virtual' in class_body[:class_body.find(method_name)],
-                'is_const': 'const' in class_body[class_body.find(method_name):class_body.find(method_name)+100]
-            })
+                # Skip operators
+                if method_name in ['~', 'operator']:
+                    continue
 
-        return methods
+                methods.append(MethodInfo(
+                    method_name,
+                    match.group('return_type'),
+                    match.group('virtual') is not None,
+                    match.group('const') is not None
+                ))
 
-    def _extract_constructors(self, class_body: str) -> List[Dict]:
-        """Extract constructor definitions"""
-        constructors = []
-        constructor_pattern = r'(\w+)\s*\([^)]*\)\s*(?::\s*[^)]*)?\s*(?:{|\s*;)'
-        matches = re.findall(constructor_pattern, class_body)
+            elif match.group('member') is not None:
+                members.append(MemberInfo(match.group('member'), match.group('member_type') or 'auto'))
 
-        for match in matches:
-            if match and not match.startswith('~'):  # Not a destructor
-                constructors.append({
-                    'name': match,
-                    'type': 'constructor'
-                })
+            else:
+                constructors.append(MemberInfo(match.group('ctor'), 'constructor'))
 
-        return constructors
+        return {
+            'methods': tuple(methods),
+            'constructors': tuple(constructors),
+            'destructors': tuple(destructors),
+            'members': tuple(members),
+            'access_specifiers': AccessSpecifiers(tuple(specifiers))
+        }
 
-    def _extract_destructors(self, class_body: str) -> List[Dict]:
-        """Extract destructor definitions"""
-        destructors = []
-        destructor_pattern = r'~(\w+)\s*\([^)]*\)\s*(?:{|\s*;)'
-        matches = re.findall(destructor_pattern, class_body)
 
-        for match in matches:
-            destructors.append({
-                'name': f"~{match}",
-                'type': 'destructor'
-            })
+# Analyzer owned by each worker process, so its content cache lives as long
+# as the worker does
+_worker_analyzer: Optional[CppCodeAnalyzer] = None
 
-        return destructors
 
-    def _extract_members(self, class_body: str) -> List[Dict]:
-        """Extract member variables"""
-        members = []
-        member_pattern = r'(?:(\w+(?:::\w+)?)\s+)?(\w+)\s+(\w+)\s*;'
-        matches = re.findall(member_pattern, class_body)
+def _analyze_file_worker(file_path: str) -> Dict:
+    """Process pool entry point: analyze one file with this worker's analyzer"""
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = CppCodeAnalyzer()
+    return _worker_analyzer.analyze_file(file_path)
+
+
+def _unlink(path: str):
+    """Delete a file, clearing the read-only bit git sets on objects if needed"""
+    try:
+        os.unlink(path)
+    except PermissionError:
+        try:
+            os.chmod(path, stat.S_IWRITE)
+            os.unlink(path)
+        except OSError:
+            pass
+    except OSError:
+        pass
+
+
+def _remove_tree(path: str):
+    """Delete a directory tree, unlinking its files from a thread pool.
 
-        for match in matches:
-            member_type = match[0] if match[0] else 'auto'
-            member_name = match[2]
-            members.append({
-                'name': member_name,
-                'type': member_type
-            })
+    On Windows and network filesystems each unlink is a round trip, so a
+    serial rmtree of a checkout spends most of its time waiting.
+    """
+    files = []
+    for root, _, names in os.walk(path):
+        files.extend(os.path.join(root, name) for name in names)
 
-        return members
+    with ThreadPoolExecutor(max_workers=REMOVE_WORKERS) as pool:
+        # Drain the iterator so every unlink has run before the directories go
+        for _ in pool.map(_unlink, files):
+            pass
 
-    def _extract_access_specifiers(self, class_body: str) -> Dict:
-        """Extract access specifiers (public, private, protected)"""
-        access_pattern = r'(public|private|protected):'
-        matches = re.findall(access_pattern, class_body)
-        return {'specifiers': matches}
+    # Only (now empty) directories are left
+    shutil.rmtree(path, ignore_errors=True)
 
 
 class GitHubRepositoryAnalyzer:
@@ -171,6 +433,7 @@ class GitHubRepositoryAnalyzer:
     def __init__(self):
         self.temp_dir = None
         self.analyzer = CppCodeAnalyzer()
+        self._cleanup_thread: Optional[threading.Thread] = None
 
     def analyze_repository(self, github_url: str) -> Dict:
         """Analyze a GitHub repository and return C++ code information"""
@@ -181,13 +444,8 @@ class GitHubRepositoryAnalyzer:
                 return {'error': 'Failed to clone repository'}
 
             # Analyze C++ files
-            cpp_files = self._find_cpp_files(repo_path)
-            analysis_results = []
-
-            for cpp_file in cpp_files:
-                file_analysis = self.analyzer.analyze_file(cpp_file)
-                if file_analysis:
-                    analysis_results.append(file_analysis)
+            cpp_files = list(self._find_cpp_files(repo_path))
+            analysis_results = [r for r in self._analyze_files(cpp_files) if r]
 
             # Generate summary
             summary = self._generate_summary(analysis_results)
@@ -203,9 +461,28 @@ class GitHubRepositoryAnalyzer:
         except Exception as e:
             return {'error': f'Analysis failed: {str(e)}'}
         finally:
-            # Clean up temp directory
+            # Clean up temp directory in the background, so the caller can
+            # serialize and emit the result meanwhile; see wait_for_cleanup
             if self.temp_dir and os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir, ignore_errors=True)
+                self._cleanup_thread = threading.Thread(target=_remove_tree, args=(self.temp_dir,))
+                self._cleanup_thread.start()
+
+    def wait_for_cleanup(self):
+        """Block until the temp directory of the last analysis is removed"""
+        if self._cleanup_thread is not None:
+            self._cleanup_thread.join()
+            self._cleanup_thread = None
+
+    def _analyze_files(self, cpp_files: List[str]) -> List[Dict]:
+        """Analyze files, spreading them over a process pool for larger repositories"""
+        workers = os.cpu_count() or 1
+        if workers == 1 or len(cpp_files) < PARALLEL_MIN_FILES:
+            return [self.analyzer.analyze_file(cpp_file) for cpp_file in cpp_files]
+
+        # Chunk so each worker gets a few large batches, amortizing IPC
+        chunksize = max(1, len(cpp_files) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_analyze_file_worker, cpp_files, chunksize=chunksize))
 
     def _clone_repository(self, github_url: str) -> Optional[str]:
         """Clone a GitHub repository to a temporary directory"""
@@ -213,60 +490,97 @@ class GitHubRepositoryAnalyzer:
             # Create temporary directory
             self.temp_dir = tempfile.mkdtemp(prefix='github_analysis_')
 
-            # Use the provided URL directly
+            # Use the provided URL directly. Only HEAD is needed, and only its
+            # C++ files, so skip history and defer blob downloads to checkout
             clone_url = github_url
             result = subprocess.run(
-                ['git', 'clone', clone_url, self.temp_dir],
+                ['git', 'clone', '--depth=1', '--filter=blob:none', '--single-branch',
+                 '--no-checkout', clone_url, self.temp_dir],
                 capture_output=True,
                 text=True,
                 timeout=300  # 5 minutes timeout
             )
 
             if result.returncode != 0:
-                import sys
                 print(f"Git clone failed: {result.stderr}", file=sys.stderr)
                 return None
 
+            # Restrict the checkout to C++ sources; if sparse checkout isn't
+            # supported the full tree is checked out instead
+            patterns = [f'*.{ext}' for ext in sorted(_CPP_EXTENSIONS)]
+            patterns += [pattern.upper() for pattern in patterns]
+            subprocess.run(
+                ['git', '-C', self.temp_dir, 'sparse-checkout', 'set', '--no-cone'] + patterns,
+                capture_output=True,
+                text=True,
+                timeout=60
+            )
+
+            result = subprocess.run(
+                ['git', '-C', self.temp_dir, 'checkout'],
+                capture_output=True,
+                text=True,
+                timeout=300
+            )
+
+            if result.returncode != 0:
+                print(f"Git checkout failed: {result.stderr}", file=sys.stderr)
+                return None
+
             return self.temp_dir
 
         except Exception as e:
-            import sys
             print(f"Error cloning repository: {e}", file=sys.stderr)
             return None
 
-    def _find_cpp_files(self, repo_path: str) -> List[str]:
-        """Find all C++ files in the repository"""
-        cpp_extensions = {'.cpp', '.cc', '.cxx', '.hpp', '.h', '.hh', '.hxx'}
-        cpp_files = []
-
-        for root, dirs, files in os.walk(repo_path):
-            # Skip common directories that shouldn't be analyzed
-            dirs[:] = [d for d in dirs if d not in {
-                '.git', 'node_modules', 'build', 'bin', 'obj', 'target'}]
-
-            for file in files:
-                if Path(file).suffix.lower() in cpp_extensions:
-                    cpp_files.append(os.path.join(root, file))
-
-        return cpp_files
+    def _find_cpp_files(self, repo_path: str) -> Iterator[str]:
+        """Find all C++ files in the repository.
+
+        Walks the tree with os.scandir, whose entries carry the file type from
+        the directory listing, so only symlinks need an extra stat. Each listing
+        is sorted by name, so files come out in the same order on every
+        filesystem.
+        """
+        pending = [repo_path]
+
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                # Unreadable or vanished directory; skip it like os.walk did
+                continue
+            for entry in entries:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    # Skip common directories that shouldn't be analyzed
+                    if name not in _SKIP_DIRS:
+                        pending.append(entry.path)
+                    continue
+
+                stem, dot, ext = name.rpartition('.')
+                if dot and stem and ext.lower() in _CPP_EXTENSIONS and entry.is_file():
+                    yield entry.path
 
     def _generate_summary(self, analysis_results: List[Dict]) -> Dict:
         """Generate a summary of the analysis results"""
         total_classes = 0
         total_methods = 0
         total_functions = 0
-        all_includes = set()
-        all_namespaces = set()
+        # dicts as ordered sets: names stay in first-seen order
+        all_includes: Dict[str, None] = {}
+        all_namespaces: Dict[str, None] = {}
 
         for result in analysis_results:
             total_classes += len(result.get('classes', []))
             total_functions += len(result.get('functions', []))
 
             for cls in result.get('classes', []):
-                total_methods += len(cls.get('methods', []))
+                total_methods += len(cls.methods)
 
-            all_includes.update(result.get('includes', []))
-            all_namespaces.update(result.get('namespaces', []))
+            all_includes.update(dict.fromkeys(result.get('includes', ())))
+            all_namespaces.update(dict.fromkeys(result.get('namespaces', ())))
 
         return {
             'total_classes': total_classes,
@@ -278,9 +592,38 @@ class GitHubRepositoryAnalyzer:
         }
 
 
+def write_json_stdout(data: Dict):
+    """Write data to stdout as indented, ASCII-only JSON.
+
+    With orjson the report is serialized into a single bytes object and
+    written at once; otherwise, json.dump streams the encoded chunks, so the
+    report is never built as one string. orjson is only used when its output
+    is pure ASCII: it cannot escape non-ASCII text, and the caller decodes
+    stdout chunk by chunk, which would mangle a character split across two
+    chunks. It also rejects the surrogate escapes os.scandir returns for file
+    names that aren't valid UTF-8. Parse records are converted to dicts here;
+    orjson serializes dataclasses natively, the json module goes through
+    _json_default.
+    """
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:  # orjson.JSONEncodeError is a TypeError
+            encoded = None
+        if encoded is not None and encoded.isascii():
+            sys.stdout.flush()
+            sys.stdout.buffer.write(encoded)
+            sys.stdout.buffer.flush()
+            return
+
+    # json.dump feeds iterencode() chunks straight to the stream, escaping
+    # anything outside ASCII
+    json.dump(data, sys.stdout, indent=2, default=_json_default)
+    sys.stdout.write('\n')
+
+
 def main():
     """Main function for testing"""
-    import sys
 
     analyzer = GitHubRepositoryAnalyzer()
 
@@ -292,7 +635,8 @@ def main():
 
     try:
         result = analyzer.analyze_repository(github_url)
-        print(json.dumps(result, indent=2))
+        write_json_stdout(result)
+        analyzer.wait_for_cleanup()
     except Exception as e:
         error_result = {
             'error': f'Analysis failed: {str(e)}',
@@ -307,7 +651,8 @@ def main():
             },
             'detailed_analysis': []
         }
-        print(json.dumps(error_result, indent=2))
+        write_json_stdout(error_result)
+        analyzer.wait_for_cleanup()
         sys.exit(1)
 
 